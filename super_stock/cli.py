@@ -0,0 +1,193 @@
+"""命令行入口: python -m super_stock <子命令>
+
+各子命令所需的模块在执行时才导入, 离线命令不会加载 akshare / yfinance / matplotlib
+"""
+import argparse
+from os.path import join, split
+
+
+def cmd_fetch(args):
+    if args.target == 'index':
+        from .utils import get_stock_index
+        for index_name in args.names:
+            print(f'{index_name}...')
+            get_stock_index.main(
+                index_name=index_name,
+                date0=args.start,
+                date1=args.end,
+                dst_fn=join(args.output, f'{index_name}.csv'))
+    elif args.target == 'stocks':
+        from .utils import get_history_value
+        get_history_value.main(args.codes_csv, args.output)
+    else:
+        from .utils import get_all_stocks
+        all_stocks = get_all_stocks.get_all_stocks()
+        all_stocks.to_csv(join(args.output, 'all_stocks_codes.csv'), encoding="utf-8-sig")
+
+
+def cmd_load(args):
+    from .utils import parse_to_db
+    parse_to_db.import_csv_dir(args.csv_dir, args.db)
+
+
+def cmd_select(args):
+    from .utils import ai_select
+    ai_select.cli_interface(start=args.start, end=args.end, choice=args.choice, db_path=args.db)
+
+
+def cmd_backtest(args):
+    import numpy as np
+    import pandas as pd
+    from . import strategy1
+
+    index_name = args.index_name or split(args.csv)[-1].split('.')[0]
+    df = pd.read_csv(args.csv)
+    if args.sweep:
+        diff_thresh_it = np.arange(0.02, 0.05, 0.001)
+        date_step_it = range(6, 37)
+        res = strategy1.sweep(df, index_name, diff_thresh_it, date_step_it)
+        strategy1.plot_sweep(res, index_name)
+    elif args.paths:
+        res = strategy1.monte_carlo(
+            df, index_name,
+            diff_thresh=args.diff_thresh,
+            date_step=args.date_step,
+            num_path=args.paths,
+            block_size=args.block_size,
+            seed=args.seed)
+        for key, value in res.items():
+            print(f'{key}: {value}')
+    else:
+        strategy1.main(df, index_name, diff_thresh=args.diff_thresh, date_step=args.date_step)
+
+
+def cmd_screen(args):
+    import pandas as pd
+    from . import strategy2_kdj
+    from .utils.ai_select import DISPLAY_OPTIONS
+
+    result = strategy2_kdj.backtest_db(
+        args.db, args.start, args.end,
+        codes=args.codes,
+        adjust=args.adjust,
+        div_window=args.div_window,
+        fee=args.fee)
+    result = result.sort_values('收益率', ascending=False)
+    with pd.option_context(*DISPLAY_OPTIONS):
+        print(result.head(args.top))
+
+
+def cmd_render(args):
+    from . import render
+
+    if args.kind == 'sweep':
+        fns = render.render_sweeps(args.sources, args.output, fmt=args.format, workers=args.workers)
+    else:
+        sources = args.sources
+        if args.db and not sources:
+            from .utils.storage import fetch_all
+            sources = [row[0] for row in fetch_all(args.db, 'SELECT DISTINCT code FROM stock_data')]
+        fns = render.render_kdj(
+            sources, args.output,
+            db_path=args.db,
+            fmt=args.format,
+            workers=args.workers,
+            max_points=args.max_points,
+            start_date=args.start,
+            end_date=args.end)
+    print(f'共生成 {len(fns)} 张图表: {args.output}')
+
+
+def cmd_serve(args):
+    from . import service
+    service.serve(args.db, host=args.host, port=args.port, cache_fn=args.cache,
+                  watch_interval=args.watch, max_cached=args.max_cached)
+
+
+def int_at_least(minimum):
+    """argparse 类型: 不小于 minimum 的整数"""
+    def parse(value):
+        number = int(value)
+        if number < minimum:
+            raise argparse.ArgumentTypeError(f'必须为不小于 {minimum} 的整数: {value}')
+        return number
+    return parse
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='super_stock', description='super-stock 数据采集/入库/选股/回测工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('fetch', help='联网下载数据')
+    p.add_argument('target', choices=['index', 'stocks', 'codes'], help='指数 / 个股历史 / 股票列表')
+    p.add_argument('--names', nargs='+', default=['HSI'], help='指数名称(target=index)')
+    p.add_argument('--codes-csv', help='股票列表文件(target=stocks)')
+    p.add_argument('--start', default='2008-01-01')
+    p.add_argument('--end', default='2024-12-31')
+    p.add_argument('-o', '--output', default='.', help='输出目录')
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser('load', help='将个股CSV目录导入SQLite')
+    p.add_argument('csv_dir')
+    p.add_argument('db')
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser('select', help='区间涨跌幅选股')
+    p.add_argument('db')
+    p.add_argument('--start', required=True)
+    p.add_argument('--end', required=True)
+    p.add_argument('--choice', default='1', choices=['1', '2', '3'])
+    p.set_defaults(func=cmd_select)
+
+    p = sub.add_parser('backtest', help='策略1回测(指数CSV)')
+    p.add_argument('csv')
+    p.add_argument('--index-name', help='价格列名, 默认取文件名')
+    p.add_argument('--diff-thresh', type=float, default=0.04)
+    p.add_argument('--date-step', type=int, default=36)
+    p.add_argument('--sweep', action='store_true', help='遍历参数网格并绘制热力图')
+    p.add_argument('--paths', type=int, default=0, help='蒙特卡洛路径数, 0 表示只回测历史路径')
+    p.add_argument('--block-size', type=int, default=12)
+    p.add_argument('--seed', type=int, default=0)
+    p.set_defaults(func=cmd_backtest)
+
+    p = sub.add_parser('screen', help='KDJ策略全市场批量回测')
+    p.add_argument('db')
+    p.add_argument('--start', required=True)
+    p.add_argument('--end', required=True)
+    p.add_argument('--codes', nargs='+', help='股票代码, 默认全部')
+    p.add_argument('--div-window', type=int_at_least(2), default=12)
+    p.add_argument('--fee', type=float, default=0.0)
+    p.add_argument('--adjust', choices=['qfq', 'hfq'], help='复权方式, 默认不复权')
+    p.add_argument('--top', type=int, default=100)
+    p.set_defaults(func=cmd_screen)
+
+    p = sub.add_parser('render', help='无界面批量出图')
+    p.add_argument('kind', choices=['kdj', 'sweep'], help='个股KDJ图 / 指数参数热力图')
+    p.add_argument('sources', nargs='*', help='CSV文件; kind=kdj 且指定 --db 时为股票代码, 为空表示全部')
+    p.add_argument('--db', help='从SQLite读取个股数据(kind=kdj)')
+    p.add_argument('--start')
+    p.add_argument('--end')
+    p.add_argument('-o', '--output', default='charts', help='输出目录')
+    p.add_argument('--format', default='png', choices=['png', 'svg'])
+    p.add_argument('--workers', type=int, help='进程数, 默认为CPU核数')
+    p.add_argument('--max-points', type=int_at_least(3), default=2000, help='日线价格曲线的最大绘制点数')
+    p.set_defaults(func=cmd_render)
+
+    p = sub.add_parser('serve', help='启动常驻查询服务(本机HTTP)')
+    p.add_argument('db')
+    p.add_argument('--host', default='127.0.0.1')
+    p.add_argument('--port', type=int, default=8765)
+    p.add_argument('--cache', help='列式缓存文件, 与数据库当前版本一致时直接加载')
+    p.add_argument('--watch', type=int, default=60, help='检测新数据的轮询间隔(秒), 0 表示不检测')
+    p.add_argument('--max-cached', type=int, default=256, help='结果缓存的最大条数')
+    p.set_defaults(func=cmd_serve)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
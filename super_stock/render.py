@@ -0,0 +1,149 @@
+"""无界面批量出图: 多进程渲染个股KDJ图和指数参数热力图, 输出 PNG/SVG 文件
+
+每个工作进程使用 Agg 后端, 并复用同一个 Figure 对象绘制所有图表
+工作进程以 spawn 方式启动, 不继承父进程的 SQLite 连接和线程(见 utils.storage)
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from os.path import join, split
+
+import numpy as np
+import pandas as pd
+
+from .utils.storage import read_prices
+
+# 工作进程内复用的 Figure, 按图表类型缓存
+_FIGURES = {}
+_CSV_COLUMNS = {'日期': 'date', '最高': 'high', '最低': 'low', '收盘': 'close'}
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+
+
+def _get_figure(kind, figsize):
+    if kind not in _FIGURES:
+        import matplotlib.pyplot as plt
+        _FIGURES[kind] = plt.figure(figsize=figsize)
+    return _FIGURES[kind]
+
+
+def downsample(series, max_points):
+    """
+    按桶保留最小值和最大值对长序列降采样, 保证曲线形态和极值不丢失
+    参数:
+        series: 以日期为索引的价格序列
+        max_points: 输出点数上限, 至少为 3(每桶最小值、最大值及末尾点)
+    """
+    if max_points < 3:
+        raise ValueError(f'max_points 至少为 3: {max_points}')
+    series = series.dropna()
+    n = len(series)
+    if n <= max_points:
+        return series
+    bucket = int(np.ceil(n / ((max_points - 1) // 2)))
+    num_bucket = n // bucket
+    values = series.to_numpy()[:num_bucket * bucket].reshape(num_bucket, bucket)
+    offsets = np.arange(num_bucket) * bucket
+    keep = np.concatenate([
+        offsets + values.argmin(axis=1),
+        offsets + values.argmax(axis=1),
+        [n - 1],
+    ])
+    return series.iloc[np.unique(keep)]
+
+
+def _load_prices(source, db_path, start_date, end_date):
+    """读取单只股票日线, source 为股票代码(db_path 非空时)或CSV文件路径"""
+    if db_path:
+        # 每个工作进程使用自己的只读连接池
+        return source, read_prices(db_path, start_date, end_date, codes=[source])
+    name = split(source)[-1].replace('.csv', '')
+    df = pd.read_csv(source).rename(columns=_CSV_COLUMNS)
+    df['date'] = pd.to_datetime(df['date'])
+    if start_date and end_date:
+        df = df[(df['date'] >= start_date) & (df['date'] <= end_date)]
+    df['code'] = name
+    return name, df
+
+
+def _render_kdj(task):
+    from .strategy2_kdj import calculate_kdj_long, convert_to_weekly_wide, draw_kdj, stack_weekly
+
+    source, db_path, output_dir, fmt, max_points, start_date, end_date = task
+    try:
+        name, df = _load_prices(source, db_path, start_date, end_date)
+        if df.empty:
+            print(f"{source} 无数据, 跳过")
+            return None
+        weekly_df = calculate_kdj_long(stack_weekly(convert_to_weekly_wide(df))).loc[name]
+        daily = df.assign(date=pd.to_datetime(df['date'])).set_index('date')['close'].sort_index()
+
+        fig = _get_figure('kdj', (14, 10))
+        draw_kdj(fig, weekly_df, title=f'{name} 周线走势及KDJ指标', price=downsample(daily, max_points))
+        dst_fn = join(output_dir, f'{name}.{fmt}')
+        fig.savefig(dst_fn)
+        return dst_fn
+    except Exception as e:
+        print(f"绘制 {source} 失败: {e}")
+        return None
+
+
+def _render_sweep(task):
+    from . import strategy1
+
+    csv_fn, output_dir, fmt, diff_thresh_it, date_step_it = task
+    index_name = split(csv_fn)[-1].split('.')[0]
+    try:
+        res = strategy1.sweep(pd.read_csv(csv_fn), index_name, diff_thresh_it, date_step_it, progress=False)
+        fig = _get_figure('sweep', (20, 12))
+        fig.clf()
+        ax, cbar_ax = fig.subplots(1, 2, gridspec_kw={'width_ratios': [40, 1]})
+        strategy1.draw_sweep(ax, res, index_name, cbar_ax=cbar_ax)
+        fig.tight_layout()
+        dst_fn = join(output_dir, f'{index_name}_sweep.{fmt}')
+        fig.savefig(dst_fn)
+        return dst_fn
+    except Exception as e:
+        print(f"绘制 {index_name} 失败: {e}")
+        return None
+
+
+def _run(func, tasks, workers):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as executor:
+        chunksize = max(1, len(tasks) // ((workers or os.cpu_count() or 1) * 4))
+        return [fn for fn in executor.map(func, tasks, chunksize=chunksize) if fn]
+
+
+def render_kdj(sources, output_dir, db_path=None, fmt='png', workers=None,
+               max_points=2000, start_date=None, end_date=None):
+    """
+    批量绘制个股KDJ图
+    参数:
+        sources: db_path 非空时为股票代码列表, 否则为个股CSV文件列表
+        fmt: 输出格式, png 或 svg
+        workers: 进程数, 默认为CPU核数
+        max_points: 日线价格曲线的最大绘制点数
+    返回:
+        成功生成的文件路径列表
+    """
+    if max_points < 3:
+        raise ValueError(f'max_points 至少为 3: {max_points}')
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(source, db_path, output_dir, fmt, max_points, start_date, end_date) for source in sources]
+    return _run(_render_kdj, tasks, workers)
+
+
+def render_sweeps(csv_fns, output_dir, fmt='png', workers=None,
+                  diff_thresh_it=np.arange(0.02, 0.05, 0.001), date_step_it=range(6, 37)):
+    """批量计算并绘制各指数策略1参数热力图, 返回成功生成的文件路径列表"""
+    os.makedirs(output_dir, exist_ok=True)
+    tasks = [(csv_fn, output_dir, fmt, diff_thresh_it, date_step_it) for csv_fn in csv_fns]
+    return _run(_render_sweep, tasks, workers)
@@ -0,0 +1,287 @@
+"""常驻查询服务: 行情数据只加载一次并常驻内存, 通过本机 HTTP 接口响应选股/涨幅排名/KDJ筛选请求
+
+接口(GET, 返回JSON, 均可附加 adjust=qfq|hfq 使用复权价格):
+    /select?start=&end=&top=                  区间涨跌幅选股, 同 ai_select.cli_interface
+    /rank?start=&end=&top=&ascending=         区间涨跌幅排名(含代码及起止价格)
+    /screen?start=&end=&top=&div_window=&fee= KDJ金叉/顶背离批量回测排名
+    /status                                   数据概况
+    /reload (POST)                            重新加载数据并清空结果缓存
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+from urllib.request import Request, urlopen
+
+import pandas as pd
+
+from .strategy2_kdj import backtest_weekly, weekly_from_wide
+from .utils.adjust import adjust_wide, factor_wide, load_adjust_factor
+from .utils.storage import connect, get_read_pool
+
+
+def db_stamp(db_path):
+    """
+    数据库内容版本标记: 数据库文件和 -wal 文件的 (修改时间, 大小)
+    WAL 模式下新写入先追加到 -wal 文件, 检查点之前数据库文件的修改时间不变, 需要一并比较
+    """
+    stamp = []
+    for fn in (db_path, db_path + '-wal'):
+        if os.path.exists(fn):
+            stat = os.stat(fn)
+            stamp.append((stat.st_mtime_ns, stat.st_size))
+        else:
+            stamp.append(None)
+    return tuple(stamp)
+
+
+class MarketData:
+    """
+    内存行情快照: 按 (日期 × 股票代码) 组织的宽表, 行按日期排序, 列按代码排序
+    区间查询只做行切片, 不再访问数据库; 保存不复权价格和复权因子, 复权价格首次使用时计算并缓存
+    """
+
+    def __init__(self, high, low, close, names, factor, latest_factor):
+        self.high = high
+        self.low = low
+        self.close = close
+        self.names = names
+        self.factor = factor
+        self.latest_factor = latest_factor
+        self._adjusted = {None: (high, low, close)}
+
+    @classmethod
+    def from_db(cls, db_path):
+        with get_read_pool(db_path).connection() as conn:
+            df = pd.read_sql('SELECT code, name, date, high, low, close FROM stock_data', conn)
+            factor_df = load_adjust_factor(conn)
+        df['date'] = pd.to_datetime(df['date'])
+        names = df.drop_duplicates('code', keep='last').set_index('code')['name']
+        wide = df.pivot(index='date', columns='code', values=['high', 'low', 'close']).sort_index()
+        close = wide['close']
+        factor, latest_factor = factor_wide(factor_df, close.index, close.columns)
+        return cls(wide['high'], wide['low'], close, names.sort_index(), factor, latest_factor)
+
+    @classmethod
+    def load(cls, db_path, cache_fn=None):
+        """读取数据; 指定 cache_fn 时优先使用与数据库当前版本一致的列式缓存文件"""
+        stamp = db_stamp(db_path)
+        if cache_fn and os.path.exists(cache_fn):
+            cached = pd.read_pickle(cache_fn)
+            if isinstance(cached, dict) and cached.pop('db_stamp', None) == stamp:
+                try:
+                    return cls(**cached)
+                except TypeError:
+                    pass
+            print(f'缓存文件已过期, 重新从数据库加载: {cache_fn}')
+        data = cls.from_db(db_path)
+        if cache_fn:
+            pd.to_pickle({
+                'high': data.high, 'low': data.low, 'close': data.close, 'names': data.names,
+                'factor': data.factor, 'latest_factor': data.latest_factor, 'db_stamp': stamp,
+            }, cache_fn)
+        return data
+
+    def prices(self, adjust=None):
+        """返回 (最高, 最低, 收盘) 宽表, adjust 为 qfq / hfq / None"""
+        if adjust not in self._adjusted:
+            self._adjusted[adjust] = tuple(
+                adjust_wide(frame, self.factor, self.latest_factor, adjust)
+                for frame in (self.high, self.low, self.close))
+        return self._adjusted[adjust]
+
+    def rows(self, start_date, end_date):
+        """日期区间对应的行切片"""
+        index = self.close.index
+        return slice(index.searchsorted(pd.Timestamp(start_date)),
+                     index.searchsorted(pd.Timestamp(end_date), side='right'))
+
+    def returns(self, start_date, end_date, adjust=None):
+        """个股区间涨跌幅, 起止价格取区间内首个/最后一个有效收盘价"""
+        close = self.prices(adjust)[2].iloc[self.rows(start_date, end_date)]
+        if close.empty:
+            return pd.DataFrame(columns=['code', 'name', 'start_price', 'end_price', 'pct_change'])
+        start_prices = close.bfill().iloc[0]
+        end_prices = close.ffill().iloc[-1]
+        result = pd.DataFrame({
+            'code': close.columns,
+            'name': self.names.reindex(close.columns).values,
+            'start_price': start_prices.values,
+            'end_price': end_prices.values,
+            'pct_change': ((end_prices - start_prices) / start_prices * 100).values,
+        })
+        return result.dropna(subset=['pct_change'])
+
+    def weekly(self, start_date, end_date, adjust=None):
+        """区间周线宽表, 只包含区间内有行情的股票(与 backtest_db 一致)"""
+        rows = self.rows(start_date, end_date)
+        high, low, close = (frame.iloc[rows] for frame in self.prices(adjust))
+        codes = close.columns[close.notna().any()]
+        return weekly_from_wide(high[codes], low[codes], close[codes])
+
+
+class QueryService:
+    """持有内存数据和结果缓存, 供多个请求线程并发查询; 结果缓存按最近最少使用淘汰, 最多保留 max_cached 条"""
+
+    def __init__(self, db_path, cache_fn=None, max_cached=256):
+        self.db_path = db_path
+        self.cache_fn = cache_fn
+        self.max_cached = max_cached
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self.data = None
+        self.loaded_at = None
+        self.reload()
+
+    def reload(self):
+        """重新加载数据, 完成后整体替换快照并清空结果缓存"""
+        data = MarketData.load(self.db_path, self.cache_fn)
+        with self._lock:
+            self.data = data
+            self.loaded_at = time.time()
+            self._cache.clear()
+
+    def _cached(self, key, func):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            data = self.data
+        result = func(data)
+        with self._lock:
+            # 计算期间数据已被替换时不写入缓存
+            if data is self.data:
+                self._cache[key] = result
+                while len(self._cache) > self.max_cached:
+                    self._cache.popitem(last=False)
+        return result
+
+    def select(self, start, end, top=100, adjust=None):
+        def run(data):
+            result = data.returns(start, end, adjust).sort_values('pct_change', ascending=False)
+            return result[['name', 'pct_change']].rename(columns={'pct_change': '涨跌幅(%)'}).head(top)
+        return self._cached(('select', start, end, top, adjust), run)
+
+    def rank(self, start, end, top=100, ascending=False, adjust=None):
+        def run(data):
+            return data.returns(start, end, adjust).sort_values('pct_change', ascending=ascending).head(top)
+        return self._cached(('rank', start, end, top, ascending, adjust), run)
+
+    def screen(self, start, end, top=100, div_window=12, fee=0.0, adjust=None):
+        def run(data):
+            result = backtest_weekly(data.weekly(start, end, adjust), div_window=div_window, fee=fee)
+            return result.sort_values('收益率', ascending=False).head(top).reset_index()
+        return self._cached(('screen', start, end, top, div_window, fee, adjust), run)
+
+    def status(self):
+        data = self.data
+        return {
+            'stocks': data.close.shape[1],
+            'dates': data.close.shape[0],
+            'start': str(data.close.index.min().date()) if len(data.close) else None,
+            'end': str(data.close.index.max().date()) if len(data.close) else None,
+            'loaded_at': self.loaded_at,
+            'cached_results': len(self._cache),
+        }
+
+    def watch(self, interval):
+        """后台轮询数据库, 其他连接写入新数据(PRAGMA data_version 变化)后自动重新加载; 加载失败时打印错误并继续轮询"""
+        def run():
+            conn = connect(self.db_path, readonly=True)
+            version = conn.execute('PRAGMA data_version').fetchone()[0]
+            while True:
+                time.sleep(interval)
+                try:
+                    current = conn.execute('PRAGMA data_version').fetchone()[0]
+                    if current != version:
+                        print('检测到新数据, 重新加载...')
+                        self.reload()
+                        version = current
+                except Exception as e:
+                    # 加载失败时保留旧数据, 下一轮继续重试
+                    print(f'重新加载失败: {e}')
+        threading.Thread(target=run, daemon=True).start()
+
+
+def _make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, body):
+            if isinstance(body, pd.DataFrame):
+                payload = body.to_json(orient='records', force_ascii=False)
+            else:
+                payload = json.dumps(body, ensure_ascii=False)
+            payload = payload.encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                top = int(params.get('top', 100))
+                adjust = params.get('adjust') or None
+                if adjust not in (None, 'qfq', 'hfq'):
+                    raise ValueError(f'未知复权方式: {adjust}')
+                if url.path == '/select':
+                    result = service.select(params['start'], params['end'], top, adjust)
+                elif url.path == '/rank':
+                    ascending = params.get('ascending', 'false').lower() in ('1', 'true')
+                    result = service.rank(params['start'], params['end'], top, ascending, adjust)
+                elif url.path == '/screen':
+                    result = service.screen(
+                        params['start'], params['end'], top,
+                        div_window=int(params.get('div_window', 12)),
+                        fee=float(params.get('fee', 0.0)),
+                        adjust=adjust)
+                elif url.path == '/status':
+                    result = service.status()
+                else:
+                    return self._send(404, {'error': f'未知接口: {url.path}'})
+            except KeyError as e:
+                return self._send(400, {'error': f'缺少参数: {e.args[0]}'})
+            except ValueError as e:
+                return self._send(400, {'error': str(e)})
+            except Exception as e:
+                return self._send(500, {'error': f'查询失败: {e}'})
+            self._send(200, result)
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/reload':
+                return self._send(404, {'error': f'未知接口: {self.path}'})
+            service.reload()
+            self._send(200, service.status())
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(db_path, host='127.0.0.1', port=8765, cache_fn=None, watch_interval=60, max_cached=256):
+    """启动查询服务(阻塞), watch_interval 为检测新数据的轮询间隔(秒), 0 表示不检测"""
+    service = QueryService(db_path, cache_fn, max_cached)
+    if watch_interval:
+        service.watch(watch_interval)
+    server = ThreadingHTTPServer((host, port), _make_handler(service))
+    print(f'查询服务已启动: http://{host}:{port} ({service.status()["stocks"]} 只股票)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def query(endpoint, url='http://127.0.0.1:8765', **params):
+    """查询服务客户端, 返回 DataFrame(列表结果) 或 dict"""
+    method = 'POST' if endpoint == 'reload' else 'GET'
+    request = Request(f'{url}/{endpoint}?{urlencode(params)}', method=method)
+    with urlopen(request) as response:
+        result = json.loads(response.read().decode('utf-8'))
+    return pd.DataFrame(result) if isinstance(result, list) else result
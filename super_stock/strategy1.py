@@ -9,9 +9,17 @@ import math
 import numpy as np
 import numpy_financial as npf
 from os.path import split
-from tqdm import tqdm
-import seaborn as sns  
-import matplotlib.pyplot as plt
+
+
+def get_monthly_data(df):
+    """返回按日期排序的日线数据和每月10号的数据点"""
+    df = df.copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    df = df.sort_values('Date').set_index('Date')
+    # 生成每月10号的数据点（自动对齐最近的有效交易日）
+    monthly_data = df.resample('MS').first().shift(9, freq='D').dropna()  # 每月10号
+    monthly_data = df.reindex(monthly_data.index, method='ffill')  # 用前向填充获取有效数据
+    return df, monthly_data
 
 
 def main(df, index_name, diff_thresh=0.04, unit_share=1000, date_step=36, verbose=True):
@@ -21,11 +29,7 @@ def main(df, index_name, diff_thresh=0.04, unit_share=1000, date_step=36, verbos
         unit_share: 定投单位金额(默认1000)
         date_step: 回朔时间(默认3年)
     '''
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.sort_values('Date').set_index('Date')
-    # 生成每月10号的数据点（自动对齐最近的有效交易日）
-    monthly_data = df.resample('MS').first().shift(9, freq='D').dropna()  # 每月10号
-    monthly_data = df.reindex(monthly_data.index, method='ffill')  # 用前向填充获取有效数据
+    df, monthly_data = get_monthly_data(df)
 
     # 初始化投资记录
     total_investment = 0  # 累计投入本金
@@ -101,18 +105,137 @@ def main(df, index_name, diff_thresh=0.04, unit_share=1000, date_step=36, verbos
     return annual_irr * 100
 
 
-if __name__ == '__main__':
-    src_fn = r'D:\codes\super-stock\data\HSI.csv'
+def annuity_irr(final_value, unit_share, num_month, n_iter=100):
+    """
+    每月定投 unit_share、期末价值 final_value 时的月度IRR(按路径向量化, 二分求解)
+    与 main 中 cash_flows 的 npf.irr 结果一致
+    """
+    final_value = np.asarray(final_value, dtype=float)
+    lo = np.full(final_value.shape, -0.99)
+    hi = np.full(final_value.shape, 1.0)
+    for _ in range(n_iter):
+        mid = (lo + hi) / 2
+        # 期末价值关于利率单调递增: FV = unit * ((1+r)^n - 1) / r
+        fv = np.where(
+            np.abs(mid) < 1e-12,
+            unit_share * num_month,
+            unit_share * np.expm1(num_month * np.log1p(mid)) / np.where(mid == 0, 1, mid))
+        too_low = fv < final_value
+        lo = np.where(too_low, mid, lo)
+        hi = np.where(too_low, hi, mid)
+    return (lo + hi) / 2
 
-    index_name = split(src_fn)[-1].split('.')[0]
-    df = pd.read_csv(src_fn)
 
-    diff_thresh_it = np.arange(0.02, 0.05, 0.001)
-    date_step_it = range(6, 37)
+def run_paths(prices, diff_thresh=0.04, unit_share=1000, date_step=36, final_price=None):
+    """
+    在多条月度价格路径上同时执行策略1
+    参数:
+        prices: (路径数 × 月数) 的每月10号价格
+        final_price: 期末估值价格, 默认为路径最后一个月的价格;
+            传入历史数据最后一个交易日收盘价时与 main 的结果一致
+    返回:
+        (策略年化IRR, 普通定投年化IRR), 均为长度为路径数的数组(%)
+    """
+    prices = np.asarray(prices, dtype=float)
+    num_path, num_month = prices.shape
+
+    # 回朔均值: 当前月之前 date_step 个月的价格均值(不足 date_step 个月时取已有月份)
+    csum = np.concatenate([np.zeros((num_path, 1)), np.cumsum(prices, axis=1)], axis=1)
+    idx = np.arange(num_month)
+    start = np.maximum(idx - date_step, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_price = (csum[:, idx] - csum[:, start]) / (idx - start)
+        pct_diff = (prices - mean_price) / mean_price
+
+    # 资金池依赖上月状态, 只在时间维上迭代, 路径维全部向量化
+    money_pool = np.zeros(num_path)
+    total_shares = np.zeros(num_path)
+    for t in range(num_month):
+        money_pool += unit_share
+        pct = pct_diff[:, t]
+        with np.errstate(invalid='ignore'):
+            investment = np.where(
+                pct < -diff_thresh,
+                np.minimum(money_pool, unit_share * np.ceil(-pct / diff_thresh)),
+                np.where(np.abs(pct) <= diff_thresh, unit_share, 0))
+        money_pool -= investment
+        total_shares += investment / prices[:, t]
+
+    if final_price is None:
+        final_price = prices[:, -1]
+    final_value = total_shares * final_price + money_pool
+    dca_value = (unit_share / prices).sum(axis=1) * final_price
+    monthly_irr = annuity_irr(final_value, unit_share, num_month)
+    dca_irr = annuity_irr(dca_value, unit_share, num_month)
+    return ((1 + monthly_irr)**12 - 1) * 100, ((1 + dca_irr)**12 - 1) * 100
+
+
+def bootstrap_paths(log_returns, p0, num_path, num_month, block_size, rng):
+    """对月度对数收益率做滑动块自助抽样, 生成 (路径数 × 月数) 的价格路径"""
+    num_block = math.ceil((num_month - 1) / block_size)
+    starts = rng.integers(0, len(log_returns) - block_size + 1, size=(num_path, num_block))
+    sample_idx = (starts[:, :, None] + np.arange(block_size)).reshape(num_path, -1)[:, :num_month - 1]
+    path_returns = np.concatenate([np.zeros((num_path, 1)), log_returns[sample_idx]], axis=1)
+    return p0 * np.exp(np.cumsum(path_returns, axis=1))
+
+
+# 每 SEED_BLOCK 条路径使用一个独立的随机数流, 结果只取决于 seed, 与 chunk_size 无关
+SEED_BLOCK = 500
+
+
+def monte_carlo(df, index_name, diff_thresh=0.04, unit_share=1000, date_step=36,
+                num_path=10000, block_size=12, num_month=None, chunk_size=2000, seed=0):
+    """
+    基于历史指数的块自助抽样蒙特卡洛, 评估策略1参数的稳健性
+    参数:
+        num_path: 模拟路径数
+        block_size: 自助抽样块长度(月), 保留收益率的短期相关性
+        num_month: 每条路径的月数, 默认与历史长度一致
+        chunk_size: 每批计算的路径数, 控制内存占用(向上取整为 SEED_BLOCK 的倍数)
+        seed: 随机种子, 相同 seed 结果可复现
+    返回:
+        dict: IRR分位数、均值及跑赢普通定投的概率
+    """
+    _, monthly_data = get_monthly_data(df)
+    hist_prices = monthly_data[index_name].to_numpy(dtype=float)
+    log_returns = np.diff(np.log(hist_prices))
+    if num_month is None:
+        num_month = len(hist_prices)
+    if len(log_returns) < block_size:
+        raise ValueError(f'历史数据不足: {len(log_returns)}个月收益率 < 块长度{block_size}')
+
+    block_sizes = [min(SEED_BLOCK, num_path - i) for i in range(0, num_path, SEED_BLOCK)]
+    rngs = [np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(len(block_sizes))]
+    blocks_per_chunk = max(1, math.ceil(chunk_size / SEED_BLOCK))
+    strategy_irr, dca_irr = [], []
+    for i in range(0, len(block_sizes), blocks_per_chunk):
+        prices = np.concatenate([
+            bootstrap_paths(log_returns, hist_prices[0], size, num_month, block_size, rng)
+            for size, rng in zip(block_sizes[i:i + blocks_per_chunk], rngs[i:i + blocks_per_chunk])])
+        irr, dca = run_paths(prices, diff_thresh, unit_share, date_step)
+        strategy_irr.append(irr)
+        dca_irr.append(dca)
+    strategy_irr = np.concatenate(strategy_irr)
+    dca_irr = np.concatenate(dca_irr)
+
+    percentiles = [5, 25, 50, 75, 95]
+    return {
+        'IRR分位数': dict(zip(percentiles, np.percentile(strategy_irr, percentiles).tolist())),
+        'IRR均值': float(strategy_irr.mean()),
+        '定投IRR中位数': float(np.median(dca_irr)),
+        '跑赢定投概率': float((strategy_irr > dca_irr).mean()),
+    }
+
+
+def sweep(df, index_name, diff_thresh_it, date_step_it, progress=True):
+    """遍历 diff_thresh × date_step 参数网格, 返回年化IRR表(%)"""
+    from tqdm import tqdm
+
     res = np.zeros((len(diff_thresh_it), len(date_step_it)))
     for i, diff_thresh in enumerate(diff_thresh_it):
-        print(f'{i} of {len(diff_thresh_it)}...')
-        for j, date_step in enumerate(tqdm(date_step_it)):
+        if progress:
+            print(f'{i} of {len(diff_thresh_it)}...')
+        for j, date_step in enumerate(tqdm(date_step_it, disable=not progress)):
             return_rate = main(
                 df,
                 index_name,
@@ -121,14 +244,37 @@ if __name__ == '__main__':
                 date_step=date_step,
                 verbose=False)
             res[i, j] = return_rate
-            # exit(0)
 
     res_columns = list(date_step_it)
     res_index = [f'{item:.3f}' for item in diff_thresh_it]
-    df = pd.DataFrame(res, columns=res_columns, index=res_index)
-    # plt.figure(figsize=(12, 8))
-    sns.heatmap(df, annot=True, fmt='.2f', cmap='coolwarm', cbar=True)
-    plt.title(index_name)
-    plt.xlabel('Month step')
-    plt.ylabel('Diff threshold')
-    plt.show() 
+    return pd.DataFrame(res, columns=res_columns, index=res_index)
+
+
+def draw_sweep(ax, res, index_name, cbar_ax=None):
+    """在 ax 上绘制参数网格热力图, cbar_ax 用于复用色条坐标轴"""
+    import seaborn as sns
+
+    sns.heatmap(res, annot=True, fmt='.2f', cmap='coolwarm', cbar=True, ax=ax, cbar_ax=cbar_ax)
+    ax.set_title(index_name)
+    ax.set_xlabel('Month step')
+    ax.set_ylabel('Diff threshold')
+
+
+def plot_sweep(res, index_name):
+    """绘制参数网格热力图"""
+    import matplotlib.pyplot as plt
+
+    draw_sweep(plt.gca(), res, index_name)
+    plt.show()
+
+
+if __name__ == '__main__':
+    src_fn = r'D:\codes\super-stock\data\HSI.csv'
+
+    index_name = split(src_fn)[-1].split('.')[0]
+    df = pd.read_csv(src_fn)
+
+    diff_thresh_it = np.arange(0.02, 0.05, 0.001)
+    date_step_it = range(6, 37)
+    res = sweep(df, index_name, diff_thresh_it, date_step_it)
+    plot_sweep(res, index_name)
@@ -1,16 +1,6 @@
 '''策略2: KDJ金叉周择机买入, 顶背离周择机卖出
 '''
 import pandas as pd
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-
-plt.rcParams['font.sans-serif'] = ['SimHei']
-plt.rcParams['axes.unicode_minus'] = False
-pd.set_option('display.max_rows', None)  # 显示所有行
-pd.set_option('display.max_columns', None)  # 显示所有列
-pd.set_option('display.width', None)  # 自动调整宽度（避免换行）
-pd.set_option('display.max_colwidth', None)  # 显示完整单元格内容
 
 
 def calculate_kdj(data, n=9, m1=3, m2=3):
@@ -63,56 +53,205 @@ def convert_to_weekly(daily_df):
     return weekly_df
 
 
-def main(csv_fn, start_date=None, end_date=None):
-    df = pd.read_csv(csv_fn, parse_dates=['日期', 'Date'])
-    df = df.sort_values('日期')
+def convert_to_weekly_wide(price_df):
+    """
+    将多只股票的日线数据转换为周线宽表(行: 周, 列: 股票代码)
+    参数:
+        price_df: 长表, 包含 code, date, high, low, close 列(与 stock_data 表一致)
+    返回:
+        {'最高': DataFrame, '最低': DataFrame, '收盘': DataFrame}
+    """
+    price_df = price_df.copy()
+    price_df['date'] = pd.to_datetime(price_df['date'])
+    # stock_data 以 (code, date) 为主键, 可直接 pivot
+    wide = price_df.pivot(index='date', columns='code', values=['high', 'low', 'close']).sort_index()
+    return weekly_from_wide(wide['high'], wide['low'], wide['close'])
 
-    if start_date and end_date:
-        mask = (df['日期'] >= start_date) & (df['日期'] <= end_date)
-        filtered_df = df.loc[mask]
-    else:
-        filtered_df = df
 
-    weekly_df = convert_to_weekly(filtered_df)
+def weekly_from_wide(high, low, close):
+    """
+    日线宽表(行: 日期, 列: 股票代码)转换为周线宽表, 周标识与 convert_to_weekly 相同
+    停牌周在宽表中为 NaN, 计算指标前需按股票剔除(见 stack_weekly)
+    """
+    year_week = close.index.strftime('%Y-%U')
+    week_end = pd.Series(close.index, index=close.index).groupby(year_week).last()
+    weekly = {
+        '最高': high.groupby(year_week).max(),
+        '最低': low.groupby(year_week).min(),
+        '收盘': close.groupby(year_week).last(),
+    }
+    for key, frame in weekly.items():
+        frame.index = pd.DatetimeIndex(week_end.loc[frame.index].values, name='日期')
+        weekly[key] = frame.sort_index()
+    return weekly
 
-    # 计算周线KDJ
-    weekly_df = calculate_kdj(weekly_df)
 
-    # 绘制KDJ图表
-    plt.figure(figsize=(14, 10))
+def stack_weekly(weekly):
+    """
+    周线宽表转为长表(索引: code, 日期), 每只股票只保留实际有交易的周
+    与逐只股票调用 convert_to_weekly 得到的周线一致
+    """
+    long = pd.DataFrame({key: weekly[key].stack() for key in ['最高', '最低', '收盘']})
+    long = long.dropna(subset=['收盘'])
+    long.index = long.index.set_names(['日期', 'code'])
+    return long.swaplevel().sort_index()
 
-    # 子图1: 价格走势
-    ax1 = plt.subplot(2, 1, 1)
-    plt.plot(weekly_df.index, weekly_df['收盘'], label='收盘价', color='blue')
-    plt.title('股票周线走势及KDJ指标')
-    plt.ylabel('价格')
-    plt.legend()
-    plt.grid(True)
 
-    # 设置x轴日期格式
-    ax1.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+def calculate_kdj_long(long, n=9, m1=3, m2=3):
+    """按股票分组计算KDJ(长表, 索引: code, 日期), 结果与逐只股票调用 calculate_kdj 相同"""
+    by_code = long.groupby(level='code', sort=False)
+    low_list = by_code['最低'].rolling(n).min().droplevel(0)
+    high_list = by_code['最高'].rolling(n).max().droplevel(0)
+    rsv = (long['收盘'] - low_list) / (high_list - low_list) * 100
+
+    long = long.assign(K=rsv.groupby(level='code', sort=False).ewm(alpha=1/m1).mean().droplevel(0))
+    long['D'] = long['K'].groupby(level='code', sort=False).ewm(alpha=1/m2).mean().droplevel(0)
+    long['J'] = 3 * long['K'] - 2 * long['D']
+    return long
+
+
+def backtest_kdj(price_df, n=9, m1=3, m2=3, div_window=12, fee=0.0):
+    """
+    KDJ金叉买入/顶背离卖出的向量化回测(一次处理多只股票, 无逐K线循环)
+    参数:
+        price_df: 长表, 包含 code, date, high, low, close 列
+        n, m1, m2: KDJ参数, 同 calculate_kdj
+        div_window: 顶背离判断窗口(周), 收盘价创窗口新高而J值未创新高即视为顶背离
+        fee: 单边交易费率, 每次开仓/平仓按该比例扣减
+    返回:
+        DataFrame(index=code): 收益率, 最大回撤, 交易次数
+    """
+    return backtest_weekly(convert_to_weekly_wide(price_df), n, m1, m2, div_window, fee)
+
+
+def backtest_weekly(weekly, n=9, m1=3, m2=3, div_window=12, fee=0.0):
+    """
+    在周线宽表(convert_to_weekly_wide / weekly_from_wide 的输出)上执行 backtest_kdj
+    所有指标和持仓都按股票分组、只在该股票有交易的周上计算, 停牌周不参与滚动窗口
+    """
+    if div_window < 2:
+        raise ValueError(f'div_window 至少为 2(与前 div_window-1 周比较): {div_window}')
+    kdj = calculate_kdj_long(stack_weekly(weekly), n, m1, m2)
+    by_code = kdj.groupby(level='code', sort=False)
+    close, k, d, j = kdj['收盘'], kdj['K'], kdj['D'], kdj['J']
+
+    # 金叉: K 上穿 D
+    golden_cross = (k > d) & (by_code['K'].shift(1) <= by_code['D'].shift(1))
+
+    # 顶背离: 收盘价突破前 div_window-1 周最高价, J 值却低于同期最高 J 值
+    def prev_high(column):
+        prev = by_code[column].shift(1)
+        return prev.groupby(level='code', sort=False).rolling(div_window - 1, min_periods=1).max().droplevel(0)
+    top_divergence = (close > prev_high('收盘')) & (j < prev_high('J'))
+
+    # 信号转持仓: 买入置1, 卖出置0, 其余沿用上一状态; 同一周同时出现时以卖出为准
+    signal = pd.Series(float('nan'), index=kdj.index)
+    signal = signal.mask(golden_cross, 1.0).mask(top_divergence, 0.0)
+    position = signal.groupby(level='code', sort=False).ffill().fillna(0.0)
+    # 信号在周收盘产生, 下一周才持有, 避免未来函数
+    holding = position.groupby(level='code', sort=False).shift(1).fillna(0.0)
+
+    weekly_ret = by_code['收盘'].pct_change().fillna(0.0)
+    entries = holding.groupby(level='code', sort=False).diff().fillna(holding)
+    strategy_ret = weekly_ret * holding - entries.abs() * fee
+
+    equity = (1 + strategy_ret).groupby(level='code', sort=False).cumprod()
+    drawdown = equity / equity.groupby(level='code', sort=False).cummax() - 1
+    result = pd.DataFrame({
+        '收益率': equity.groupby(level='code').last() - 1,
+        '最大回撤': drawdown.groupby(level='code').min(),
+        '交易次数': (entries > 0).groupby(level='code').sum(),
+    })
+    result.index.name = 'code'
+    return result
+
+
+def backtest_db(db_path, start_date, end_date, codes=None, adjust=None, **kwargs):
+    """
+    从 stock_data 表读取行情并批量回测, codes 为空时回测全部股票
+    adjust: qfq(前复权) / hfq(后复权) / None(不复权), 复权因子取自 adjust_factor 表
+    """
+    from .utils.storage import get_read_pool, read_prices
+
+    price_df = read_prices(db_path, start_date, end_date, codes)
+    if adjust:
+        from .utils.adjust import adjust_prices, load_adjust_factor
+        with get_read_pool(db_path).connection() as conn:
+            price_df = adjust_prices(price_df, load_adjust_factor(conn, codes), adjust)
+    return backtest_kdj(price_df, **kwargs)
+
+
+def draw_kdj(fig, weekly_df, title='股票周线走势及KDJ指标', price=None):
+    """
+    在 fig 上绘制价格走势及KDJ指标, fig 已有两个子图时清空后复用
+    参数:
+        weekly_df: calculate_kdj 输出的周线数据
+        price: 价格子图使用的序列, 默认为周线收盘价
+    """
+    import matplotlib.dates as mdates
+
+    if len(fig.axes) == 2:
+        ax1, ax2 = fig.axes
+        ax1.clear()
+        ax2.clear()
+    else:
+        fig.clf()
+        ax1, ax2 = fig.subplots(2, 1)
+    if price is None:
+        price = weekly_df['收盘']
+
+    # 子图1: 价格走势
+    ax1.plot(price.index, price.values, label='收盘价', color='blue')
+    ax1.set_title(title)
+    ax1.set_ylabel('价格')
+    ax1.legend()
+    ax1.grid(True)
 
     # 子图2: KDJ指标
-    ax2 = plt.subplot(2, 1, 2)
-    plt.plot(weekly_df.index, weekly_df['K'], label='K值', color='blue')
-    plt.plot(weekly_df.index, weekly_df['D'], label='D值', color='orange')
-    plt.plot(weekly_df.index, weekly_df['J'], label='J值', color='purple')
+    ax2.plot(weekly_df.index, weekly_df['K'], label='K值', color='blue')
+    ax2.plot(weekly_df.index, weekly_df['D'], label='D值', color='orange')
+    ax2.plot(weekly_df.index, weekly_df['J'], label='J值', color='purple')
 
     # 添加超买超卖线
-    plt.axhline(y=80, color='red', linestyle='--', linewidth=1, label='超买线(80)')
-    plt.axhline(y=20, color='green', linestyle='--', linewidth=1, label='超卖线(20)')
+    ax2.axhline(y=80, color='red', linestyle='--', linewidth=1, label='超买线(80)')
+    ax2.axhline(y=20, color='green', linestyle='--', linewidth=1, label='超卖线(20)')
 
-    plt.ylabel('KDJ值')
-    plt.legend()
-    plt.grid(True)
+    ax2.set_ylabel('KDJ值')
+    ax2.legend()
+    ax2.grid(True)
 
     # 设置x轴日期格式
-    ax2.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    for ax in (ax1, ax2):
+        ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
 
     # 自动调整日期标签
-    plt.gcf().autofmt_xdate()
+    fig.autofmt_xdate()
+    fig.tight_layout()
 
-    plt.tight_layout()
+
+def main(csv_fn, start_date=None, end_date=None):
+    import matplotlib.pyplot as plt
+
+    plt.rcParams['font.sans-serif'] = ['SimHei']
+    plt.rcParams['axes.unicode_minus'] = False
+
+    df = pd.read_csv(csv_fn, parse_dates=['日期', 'Date'])
+    df = df.sort_values('日期')
+
+    if start_date and end_date:
+        mask = (df['日期'] >= start_date) & (df['日期'] <= end_date)
+        filtered_df = df.loc[mask]
+    else:
+        filtered_df = df
+
+    weekly_df = convert_to_weekly(filtered_df)
+
+    # 计算周线KDJ
+    weekly_df = calculate_kdj(weekly_df)
+
+    # 绘制KDJ图表
+    fig = plt.figure(figsize=(14, 10))
+    draw_kdj(fig, weekly_df)
     plt.show()
 
 
@@ -0,0 +1,103 @@
+"""复权计算: 数据库只保存不复权日线和后复权因子, 前/后复权价格按需向量化计算
+
+后复权价 = 不复权价 × 因子
+前复权价 = 不复权价 × 因子 / 最新因子
+"""
+import pandas as pd
+
+from .storage import in_clause
+
+PRICE_COLUMNS = ['open', 'close', 'high', 'low']
+
+
+def market_prefix(code):
+    """股票代码对应的交易所前缀"""
+    if code.startswith(('6', '9')):
+        return 'sh'
+    if code.startswith(('4', '8')):
+        return 'bj'
+    return 'sz'
+
+
+def fetch_adjust_factor(code):
+    """获取后复权因子(只包含因子发生变化的日期), 返回 date, factor 两列"""
+    import akshare as ak
+
+    df = ak.stock_zh_a_daily(symbol=f'{market_prefix(code)}{code}', adjust='hfq-factor')
+    df = df.rename(columns={'hfq_factor': 'factor'})
+    df['date'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m-%d')
+    df['factor'] = df['factor'].astype(float)
+    return df[['date', 'factor']].sort_values('date').reset_index(drop=True)
+
+
+def load_adjust_factor(conn, codes=None):
+    """从 adjust_factor 表读取复权因子, codes 为空时读取全部股票; 旧数据库没有该表时返回空表"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'adjust_factor'").fetchone()
+    if not exists:
+        return pd.DataFrame(columns=['code', 'date', 'factor'])
+    query = 'SELECT code, date, factor FROM adjust_factor'
+    params = []
+    if codes:
+        query += f' WHERE code {in_clause(codes)}'
+        params = list(codes)
+    return pd.read_sql(query, conn, params=params)
+
+
+def factor_wide(factor_df, dates, codes):
+    """
+    将复权因子展开为 (日期 × 股票代码) 宽表, 每个交易日取不晚于该日的最近因子
+    返回:
+        (因子宽表, 各股票最新因子), 缺少因子的股票按 1.0 处理
+    """
+    factor_df = factor_df.assign(date=pd.to_datetime(factor_df['date'])).sort_values('date')
+    factor = factor_df.pivot(index='date', columns='code', values='factor')
+    factor = factor.reindex(factor.index.union(dates)).ffill().reindex(dates)
+    factor = factor.reindex(columns=codes).fillna(1.0)
+    latest = factor_df.groupby('code')['factor'].last().reindex(codes).fillna(1.0)
+    return factor, latest
+
+
+def adjust_wide(frame, factor, latest, mode):
+    """对价格宽表复权, mode 为 qfq(前复权) / hfq(后复权) / None(不复权)"""
+    if mode == 'hfq':
+        return frame * factor
+    if mode == 'qfq':
+        return frame * factor / latest
+    if mode:
+        raise ValueError(f'未知复权方式: {mode}')
+    return frame
+
+
+def adjust_prices(price_df, factor_df, mode):
+    """
+    对长表(code, date, 价格列)复权
+    参数:
+        price_df: 包含 code, date 及 open/close/high/low 中任意价格列
+        factor_df: 包含 code, date, factor 列
+        mode: qfq / hfq / None
+    """
+    if not mode:
+        return price_df
+    if mode not in ('qfq', 'hfq'):
+        raise ValueError(f'未知复权方式: {mode}')
+    if factor_df.empty:
+        # 旧数据库或所选股票没有因子: 按因子 1.0 处理, 价格不变
+        return price_df
+    prices = price_df.reset_index(drop=True)
+    # 代码列统一为字符串, 避免 merge_asof 因两侧 dtype 不同(object / StringDtype)报错
+    prices = prices.assign(code=prices['code'].astype(str), _date=pd.to_datetime(prices['date']))
+    prices = prices.sort_values('_date', kind='stable')
+    factors = factor_df.assign(code=factor_df['code'].astype(str), _date=pd.to_datetime(factor_df['date']))
+    factors = factors.sort_values('_date')
+    merged = pd.merge_asof(prices, factors[['code', '_date', 'factor']], on='_date', by='code')
+    # merge_asof 按日期排序输出, 还原为输入的行顺序
+    merged.index = prices.index
+    merged = merged.sort_index()
+    ratio = merged['factor'].fillna(1.0)
+    if mode == 'qfq':
+        latest = factors.groupby('code')['factor'].last()
+        ratio = ratio / merged['code'].map(latest).fillna(1.0)
+    columns = [col for col in PRICE_COLUMNS if col in merged]
+    merged[columns] = merged[columns].mul(ratio, axis=0)
+    return merged.drop(columns=['_date', 'factor'])
@@ -3,32 +3,36 @@ A股智能选股框架 v1.0
 功能：支持自定义时间窗口内按涨跌幅/流通市值的多条件排序
 架构：分层设计（数据层/服务层/展示层）
 """
-import sqlite3
 import pandas as pd
 from datetime import datetime
 import time
 
-pd.set_option('display.max_rows', None)  # 显示所有行
-pd.set_option('display.max_columns', None)  # 显示所有列
-pd.set_option('display.width', None)  # 自动调整宽度（避免换行）
-pd.set_option('display.max_colwidth', None)  # 显示完整单元格内容
+from .storage import read_sql
+
+# 打印结果时使用的显示选项, 仅在 cli_interface 中临时生效
+DISPLAY_OPTIONS = (
+    'display.max_rows', None,  # 显示所有行
+    'display.max_columns', None,  # 显示所有列
+    'display.width', None,  # 自动调整宽度（避免换行）
+    'display.max_colwidth', None,  # 显示完整单元格内容
+)
 
 
 class DataManager:
     def __init__(self, db_path):
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = db_path
 
     def get_price_data(self, start_date, end_date):
         """获取指定时间段的行情数据"""
-        query = f'''SELECT code, name, date, close 
+        query = '''SELECT code, name, date, close 
                    FROM stock_data 
-                   WHERE date BETWEEN '{start_date}' AND '{end_date}'
+                   WHERE date BETWEEN ? AND ?
                    ORDER BY code, date'''
-        return pd.read_sql(query, self.conn)
+        return read_sql(self.db_path, query, (start_date, end_date))
     
     def get_float_shares(self):
         """获取股票流通股本"""
-        return pd.read_sql("SELECT code, name FROM stock_basic", self.conn)
+        return read_sql(self.db_path, "SELECT code, name FROM stock_basic")
 
 
 # ==================== 服务层 ====================
@@ -82,7 +86,8 @@ def cli_interface(start, end, choice, db_path):
     # 执行查询
     result = selector.select_stocks(start, end, conditions)
     print("\n排序结果：")
-    print(result.head(100))
+    with pd.option_context(*DISPLAY_OPTIONS):
+        print(result.head(100))
 
 
 if __name__ == '__main__':
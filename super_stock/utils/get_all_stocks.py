@@ -1,12 +1,13 @@
-import akshare as ak
 import pandas as pd
 from datetime import datetime, timedelta
 import time
-from tqdm import tqdm
 
 
 def get_all_stocks():
     """获取沪深两市全部A股列表"""
+    import akshare as ak
+    from tqdm import tqdm
+
     # 上证
     sh = ak.stock_info_sh_name_code(symbol="主板A股")  # 证券代码, 证券简称, 公司全称, 上市日期
     float_data = []
@@ -41,6 +42,7 @@ def get_all_stocks():
 
 def get_listing_date(stock_code):
     """获取上市日期"""
+    import akshare as ak
     try:
         if stock_code.startswith('6'):
             info = ak.stock_individual_info_em(symbol=f"sh{stock_code}")
@@ -53,13 +55,30 @@ def get_listing_date(stock_code):
         return None
 
 
-def get_historical_price(stock_code, target_date):
-    """获取指定日期历史价格（前复权）"""
+def get_historical_price(stock_code, target_date, adjust='qfq', db_path=None):
+    """
+    获取指定日期历史价格（默认前复权, 与最新不复权价格同一基准, 可直接和实时价格比较）
+    db_path 非空时从本地 stock_data / adjust_factor 表读取不复权价格和复权因子计算, 不发起网络请求
+    """
+    end_date = target_date + timedelta(days=3)
+    if db_path:
+        from .adjust import adjust_prices, load_adjust_factor
+        from .storage import get_read_pool, read_prices
+        price = read_prices(db_path, target_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d"),
+                            codes=[stock_code], columns=('code', 'date', 'close'))
+        if price.empty:
+            return None
+        with get_read_pool(db_path).connection() as conn:
+            factor_df = load_adjust_factor(conn, [stock_code])
+        price = price.sort_values('date').iloc[:1]
+        return adjust_prices(price, factor_df, adjust)['close'].iloc[0]
+
+    import akshare as ak
     try:
         df = ak.stock_zh_a_hist(symbol=stock_code, period="daily", 
                               start_date=target_date.strftime("%Y%m%d"),
-                              end_date=(target_date + timedelta(days=3)).strftime("%Y%m%d"),
-                              adjust="hfq")
+                              end_date=end_date.strftime("%Y%m%d"),
+                              adjust=adjust or "")
         return df.iloc[0]['收盘'] if not df.empty else None
     except Exception as e:
         print(f"获取{stock_code}历史数据失败：{e}")
@@ -68,6 +87,7 @@ def get_historical_price(stock_code, target_date):
 
 def get_current_price(stock_code):
     """获取实时最新价格"""
+    import akshare as ak
     try:
         df = ak.stock_zh_a_spot_em()
         return df[df['代码'] == stock_code]['最新价'].values[0]
@@ -82,6 +102,7 @@ if __name__ == "__main__":
     exit(0)
 
     result = []
+    db_path = r"C:\Apps\sqlite\dbs\stocks.db"  # 本地行情库, 基准价格由不复权价格和 adjust_factor 表计算
     
     ten_years_ago = datetime.now() - timedelta(days=365*10)
     
@@ -102,7 +123,7 @@ if __name__ == "__main__":
             base_date = listing_date
         
         # 获取基准价格
-        base_price = get_historical_price(code, base_date)
+        base_price = get_historical_price(code, base_date, db_path=db_path)
         if not base_price:
             continue
         
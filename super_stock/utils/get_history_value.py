@@ -1,4 +1,3 @@
-import akshare as ak
 import pandas as pd
 import os
 import time
@@ -6,6 +5,7 @@ import time
 
 def get_a_share_index(symbol, name, date0, date1):
     """获取A股指数数据"""
+    import akshare as ak
     try:
         df = ak.index_zh_a_hist(
             symbol=symbol, 
@@ -20,15 +20,38 @@ def get_a_share_index(symbol, name, date0, date1):
         return None
 
 
+def get_stock_hist(code, name, date0, date1):
+    """获取个股不复权日线数据"""
+    import akshare as ak
+    try:
+        df = ak.stock_zh_a_hist(
+            symbol=code,
+            period="daily",
+            start_date=date0.replace('-', ''),
+            end_date=date1.replace('-', ''),
+            adjust=""
+        )
+        df['Date'] = pd.to_datetime(df['日期'])
+        return df
+    except Exception as e:
+        print(f"获取{name}数据失败: {e}")
+        return None
+
+
 def main(stocks_fn, output_dir):
+    """下载个股不复权日线到 output_dir, 后复权因子到 output_dir/factor"""
+    from .adjust import fetch_adjust_factor
+
     # 列名为：编号,证券代码,证券简称,上市日期
     stocks_df = pd.read_csv(stocks_fn, dtype={'证券代码': str})
-    os.makedirs(output_dir, exist_ok=True)
+    factor_dir = os.path.join(output_dir, 'factor')
+    os.makedirs(factor_dir, exist_ok=True)
     for index, row in stocks_df.iterrows():
         code = row["证券代码"]
         name = row["证券简称"]
         file_path = os.path.join(output_dir, f"{code}_{name}.csv")
-        if os.path.exists(file_path):
+        factor_path = os.path.join(factor_dir, f"{code}.csv")
+        if os.path.exists(file_path) and os.path.exists(factor_path):
             continue
         # 补充.SZ 或 .SH 后缀
         if code.startswith("6"):
@@ -37,9 +60,12 @@ def main(stocks_fn, output_dir):
             full_code = f"{code}.SZ"
         try:
             print(f"正在获取：{full_code} - {name}")
-            df = get_a_share_index(code, name, '19900101', '20241231')
-            df = df.sort_index().dropna(how='all')
-            df.to_csv(file_path, encoding="utf-8-sig", index=False)
+            if not os.path.exists(file_path):
+                df = get_stock_hist(code, name, '19900101', '20241231')
+                df = df.sort_index().dropna(how='all')
+                df.to_csv(file_path, encoding="utf-8-sig", index=False)
+            # 复权因子只在除权除息日变化, 一次下载即可服务前/后复权
+            fetch_adjust_factor(code).to_csv(factor_path, encoding="utf-8-sig", index=False)
             time.sleep(1)  # 防止请求过快被封
 
         except Exception as e:
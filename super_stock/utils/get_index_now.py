@@ -1,5 +1,3 @@
-import yfinance as yf
-import akshare as ak
 import pandas as pd
 from os.path import join
 from datetime import datetime
@@ -17,6 +15,7 @@ INDEX_CODE = {
 
 def get_a_share_index(symbol, name, date0, date1):
     """获取A股指数数据"""
+    import akshare as ak
     try:
         df = ak.index_zh_a_hist(
             symbol=symbol, 
@@ -33,6 +32,7 @@ def get_a_share_index(symbol, name, date0, date1):
 
 def get_us_index(ticker, name, date0, date1):
     """获取美股指数数据"""
+    import yfinance as yf
     try:
         nasdaq = yf.Ticker(ticker)
         data = nasdaq.history(start=date0, end=date1)
@@ -1,14 +1,17 @@
 import csv
-import sqlite3
 from datetime import datetime
 from os.path import join, split
 from glob import glob
-from tqdm import tqdm
+
+from .storage import get_writer
 
 
 def create_stock_table(db_path):
     """创建股票数据表"""
-    conn = sqlite3.connect(db_path)
+    get_writer(db_path).submit(_create_tables).result()
+
+
+def _create_tables(conn):
     cursor = conn.cursor()
     # 日期,开盘,收盘,最高,最低,成交量,成交额,振幅,涨跌幅,涨跌额,换手率,Date
     cursor.execute('''
@@ -29,16 +32,20 @@ def create_stock_table(db_path):
         PRIMARY KEY (code, date) -- 联合主键
     )
     ''')
-    
-    conn.commit()
-    conn.close()
+    # 后复权因子, 只记录因子发生变化的日期; stock_data 保存不复权价格
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS adjust_factor (
+        code TEXT,               -- 股票代码
+        date DATE,               -- 因子生效日期
+        factor REAL,             -- 后复权因子
+        PRIMARY KEY (code, date) -- 联合主键
+    )
+    ''')
 
 
 def import_csv_to_sqlite(csv_file, db_path, code, name):
-    """将CSV数据导入SQLite数据库"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    """将CSV数据导入SQLite数据库, 解析在调用线程完成, 写入交给单写线程在一个事务内执行"""
+    rows = []
     with open(csv_file, 'r', encoding='utf-8-sig') as f:
         reader = csv.DictReader(f)
         
@@ -51,12 +58,7 @@ def import_csv_to_sqlite(csv_file, db_path, code, name):
                 date_obj = datetime.strptime(date_str, '%Y-%m-%d')
                 formatted_date = date_obj.strftime('%Y-%m-%d')
                 
-                cursor.execute('''
-                INSERT OR REPLACE INTO stock_data (
-                    code, name, date, open, close, high, low, volume, amount, 
-                    amplitude, change_percent, change_amount, turnover_rate
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (
+                rows.append((
                     code,
                     name,
                     formatted_date,
@@ -76,18 +78,42 @@ def import_csv_to_sqlite(csv_file, db_path, code, name):
                 print(f"跳过无效数据行 (日期: {date_str}): {e}")
                 continue
     
-    conn.commit()
-    conn.close()
+    get_writer(db_path).executemany('''
+    INSERT OR REPLACE INTO stock_data (
+        code, name, date, open, close, high, low, volume, amount, 
+        amplitude, change_percent, change_amount, turnover_rate
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', rows).result()
     print(f"数据已成功导入到 {db_path}")
 
 
-if __name__ == "__main__":
-    # 配置参数
-    csv_path = r'D:\codes\super-stock\data\all'
-    sqlite_db_path = r"C:\Apps\sqlite\dbs\stocks.db"
-    # create_stock_table(sqlite_db_path)
+def import_factor_csv(csv_file, db_path, code):
+    """将复权因子CSV(date, factor)导入 adjust_factor 表, 覆盖该股票原有因子"""
+    with open(csv_file, 'r', encoding='utf-8-sig') as f:
+        rows = [(code, row['date'], float(row['factor'])) for row in csv.DictReader(f)]
+
+    def write(conn):
+        conn.execute('DELETE FROM adjust_factor WHERE code = ?', (code,))
+        conn.executemany('INSERT INTO adjust_factor (code, date, factor) VALUES (?, ?, ?)', rows)
+
+    get_writer(db_path).submit(write).result()
+
+
+def import_csv_dir(csv_path, db_path):
+    """导入目录下全部 {代码}_{名称}.csv 文件, 以及 factor 子目录下的 {代码}.csv 复权因子"""
+    from tqdm import tqdm
 
+    create_stock_table(db_path)
     fns = glob(join(csv_path, '*.csv'))
     for csv_file_path in tqdm(fns):
         code, name = split(csv_file_path)[-1].replace('.csv', '').split('_')
-        import_csv_to_sqlite(csv_file_path, sqlite_db_path, code, name)
+        import_csv_to_sqlite(csv_file_path, db_path, code, name)
+    for csv_file_path in glob(join(csv_path, 'factor', '*.csv')):
+        import_factor_csv(csv_file_path, db_path, split(csv_file_path)[-1].replace('.csv', ''))
+
+
+if __name__ == "__main__":
+    # 配置参数
+    csv_path = r'D:\codes\super-stock\data\all'
+    sqlite_db_path = r"C:\Apps\sqlite\dbs\stocks.db"
+    import_csv_dir(csv_path, sqlite_db_path)
@@ -1,12 +1,12 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 
 
-plt.rcParams['font.sans-serif'] = ['SimHei']  # 指定默认字体为黑体
-plt.rcParams['axes.unicode_minus'] = False    # 解决负号显示问题
+def stock_stat(file_path):
+    import matplotlib.pyplot as plt
 
+    plt.rcParams['font.sans-serif'] = ['SimHei']  # 指定默认字体为黑体
+    plt.rcParams['axes.unicode_minus'] = False    # 解决负号显示问题
 
-def stock_stat(file_path):
     data = pd.read_csv(file_path, dtype={'证券代码': str})
     # 提取年份和交易所分类
     data['上市年份'] = pd.to_datetime(data['上市日期']).dt.year
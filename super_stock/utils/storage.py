@@ -0,0 +1,189 @@
+"""SQLite 访问层: WAL 模式 + 只读连接池 + 单写线程
+
+读: 每个进程按数据库维护一个只读连接池, 线程借出/归还连接, 多个进程的读请求可与写入同时进行
+写: 每个进程一个写线程串行执行写任务, 每个任务为一个事务; 跨进程写入由 WAL 和 busy_timeout 协调
+WAL 模式由写连接开启, 只读连接不修改数据库文件
+
+多进程: 本模块使用 SQLite 期间不能 fork(会继承其他线程持有的锁和打开的连接, 子进程可能卡死),
+需要进程池时使用 spawn / forkserver 启动方式, 子进程各自建立连接池
+"""
+import os
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+# 连接参数
+BUSY_TIMEOUT = 30  # 秒, 等待其他进程释放写锁
+PRAGMAS = {
+    'mmap_size': 256 * 1024 * 1024,  # 内存映射读取, 减少拷贝
+    'cache_size': -64 * 1024,  # 页缓存 64MB(负数单位为KB)
+    'temp_store': 'MEMORY',  # 排序/临时表放在内存
+}
+CACHED_STATEMENTS = 256  # 每个连接缓存的预编译语句数
+
+_lock = threading.Lock()
+_pools = {}
+_writers = {}
+
+
+def connect(db_path, readonly=False):
+    """打开连接并应用 PRAGMA; 写连接同时开启 WAL"""
+    if readonly:
+        uri = Path(db_path).absolute().as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT,
+                               check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+        conn.execute('PRAGMA query_only = 1')
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT,
+                               check_same_thread=False, cached_statements=CACHED_STATEMENTS)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')  # WAL 下足够安全, 提交时不必每次刷盘
+    for key, value in PRAGMAS.items():
+        conn.execute(f'PRAGMA {key} = {value}')
+    return conn
+
+
+class ReadPool:
+    """只读连接池, 连接按需创建, 最多保留 size 个空闲连接"""
+
+    def __init__(self, db_path, size=None):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=size or (os.cpu_count() or 4))
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = connect(self.db_path, readonly=True)
+        try:
+            yield conn
+        finally:
+            try:
+                self._idle.put_nowait(conn)
+            except queue.Full:
+                conn.close()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class Writer:
+    """单写线程: 写任务排队串行执行, 每个任务在一个事务内完成"""
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # 在调用线程打开连接, 路径错误等异常直接抛给调用方
+        self._conn = connect(db_path)
+        self._jobs = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def _run(self):
+        conn = self._conn
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            func, future = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                with conn:  # 成功提交, 异常回滚
+                    result = func(conn)
+                future.set_result(result)
+            except BaseException as e:
+                future.set_exception(e)
+        conn.close()
+
+    def submit(self, func):
+        """提交写任务 func(conn), 返回 Future"""
+        future = Future()
+        with self._close_lock:
+            if self._closed:
+                raise RuntimeError(f'写线程已关闭: {self.db_path}')
+            self._jobs.put((func, future))
+        return future
+
+    def execute(self, sql, params=()):
+        return self.submit(lambda conn: conn.execute(sql, params).rowcount)
+
+    def executemany(self, sql, rows):
+        return self.submit(lambda conn: conn.executemany(sql, rows).rowcount)
+
+    def close(self):
+        """处理完已提交的任务后退出写线程, 之后再提交任务会报错"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._jobs.put(None)
+        self._thread.join()
+
+
+def _key(db_path):
+    # 按进程区分只是防止误用父进程的对象, 并不保证 fork 安全(见模块说明)
+    return os.getpid(), os.path.abspath(db_path)
+
+
+def get_read_pool(db_path):
+    """当前进程中该数据库的只读连接池, 数据库文件不存在时报错(不会创建空库)"""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f'数据库文件不存在: {db_path}')
+    key = _key(db_path)
+    with _lock:
+        if key not in _pools:
+            _pools[key] = ReadPool(db_path)
+        return _pools[key]
+
+
+def get_writer(db_path):
+    """当前进程中该数据库的写线程, 已关闭的写线程会被替换"""
+    key = _key(db_path)
+    with _lock:
+        if key not in _writers or _writers[key].closed:
+            _writers[key] = Writer(db_path)
+        return _writers[key]
+
+
+def read_sql(db_path, query, params=()):
+    """从连接池借只读连接执行查询, 返回 DataFrame"""
+    with get_read_pool(db_path).connection() as conn:
+        return pd.read_sql(query, conn, params=list(params))
+
+
+def fetch_all(db_path, query, params=()):
+    """从连接池借只读连接执行查询, 返回元组列表"""
+    with get_read_pool(db_path).connection() as conn:
+        return conn.execute(query, params).fetchall()
+
+
+def in_clause(values):
+    """生成 IN (?, ?, ...) 占位符"""
+    return f"IN ({','.join('?' * len(values))})"
+
+
+def read_prices(db_path, start_date=None, end_date=None, codes=None,
+                columns=('code', 'date', 'high', 'low', 'close')):
+    """读取 stock_data 行情(长表), 日期和代码条件均可省略"""
+    query = f"SELECT {', '.join(columns)} FROM stock_data WHERE date BETWEEN ? AND ?"
+    params = [start_date or '0000-00-00', end_date or '9999-99-99']
+    if codes:
+        query += f' AND code {in_clause(codes)}'
+        params += list(codes)
+    return read_sql(db_path, query, params)
@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+from super_stock.strategy2_kdj import (
+    backtest_kdj, calculate_kdj, calculate_kdj_long, convert_to_weekly, convert_to_weekly_wide, stack_weekly)
+
+
+def _price_df():
+    rng = np.random.default_rng(0)
+    dates = pd.bdate_range('2020-01-01', '2022-12-31')
+    frames = []
+    for code in ['600000', '000001', '300001']:
+        close = np.exp(np.cumsum(rng.normal(0, 0.02, len(dates)))) * 10
+        df = pd.DataFrame({'code': code, 'date': dates, 'close': close, 'high': close * 1.01, 'low': close * 0.98})
+        if code == '600000':
+            # 停牌3周
+            df = df[(df['date'] < '2021-03-01') | (df['date'] >= '2021-03-22')]
+        if code == '300001':
+            # 区间中途上市
+            df = df[df['date'] >= '2021-06-01']
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _single(df):
+    df = df.rename(columns={'date': '日期', 'close': '收盘', 'high': '最高', 'low': '最低'})
+    return calculate_kdj(convert_to_weekly(df.assign(开盘=df['收盘'], 成交量=0, 成交额=0)))
+
+
+def test_batch_kdj_matches_single_stock():
+    price_df = _price_df()
+    kdj = calculate_kdj_long(stack_weekly(convert_to_weekly_wide(price_df)))
+    for code, df in price_df.groupby('code'):
+        expected = _single(df)
+        actual = kdj.loc[code]
+        assert (actual.index == expected.index).all()
+        for column in ['K', 'D', 'J']:
+            np.testing.assert_allclose(actual[column], expected[column])
+
+
+def test_batch_backtest_matches_single_stock():
+    price_df = _price_df()
+    result = backtest_kdj(price_df)
+    for code, df in price_df.groupby('code'):
+        pd.testing.assert_series_equal(result.loc[code], backtest_kdj(df).loc[code])